@@ -0,0 +1,59 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+from cachetools import TTLCache
+
+
+# Default cache settings for app detail responses
+CACHE_MAXSIZE = 10_000
+CACHE_TTL = 3600
+
+
+class ResponseCache:
+    """In-memory TTL cache with per-key singleflight for async lookups
+
+    Concurrent misses on the same key share a single upstream fetch:
+    the first caller starts it as a task and every caller awaits that
+    same task, so they all get the same value or the same exception.
+    Failed fetches are not cached; the next miss after a failure
+    fetches again.
+    """
+
+    def __init__(self, maxsize: int = CACHE_MAXSIZE, ttl: int = CACHE_TTL):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def get_or_fetch(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value for `key`, calling `fetch` on a miss"""
+        try:
+            return self._cache[key]
+        except KeyError:
+            pass
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_and_store(key, fetch))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        # Shield the shared fetch so one caller being cancelled doesn't cancel it for the rest
+        return await asyncio.shield(task)
+
+    async def _fetch_and_store(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        value = await fetch()
+        self._cache[key] = value
+        return value
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved in case every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def clear(self) -> None:
+        """Drop all cached entries"""
+        self._cache.clear()
+
+
+# Create a singleton instance
+cache = ResponseCache()
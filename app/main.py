@@ -1,11 +1,21 @@
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.responses import Response, HTMLResponse
+from contextlib import asynccontextmanager
+from typing import Annotated, List, Optional
+
+from fastapi import Body, FastAPI, HTTPException, Query, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.exception_handlers import request_validation_exception_handler
+from fastapi.responses import Response, HTMLResponse, ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from pydantic import Field
+import asyncio
+import hashlib
+import httpx
 import logging
-import json
+import orjson
 
-from .schemas import AppDetails, ErrorResponse
+from .schemas import AppDetails, BatchItem, ErrorResponse
 from .scraper import scraper, AptoideScraperException
+from .cache import cache, CACHE_TTL
 
 # Set up logging
 logging.basicConfig(
@@ -14,6 +24,15 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Android package name: at least two segments (e.g., com.whatsapp or com.example.app).
+# Labels start with a letter, then letters/digits/underscores; segments separated by dots
+_PKG_PATTERN = r'^[a-zA-Z][a-zA-Z0-9_]*(\.[a-zA-Z][a-zA-Z0-9_]*){1,}$'
+PackageName = Annotated[str, Field(min_length=1, max_length=255, pattern=_PKG_PATTERN)]
+
+# Batch lookups: max packages per request, and max concurrent lookups across all batch requests
+BATCH_MAX_SIZE = 100
+BATCH_CONCURRENCY = 20
+
 
 def get_search_page() -> str:
     """Generate HTML search page"""
@@ -430,13 +449,38 @@ def get_search_page() -> str:
 </html>
     """
 
+# The search page never changes at runtime, so build and encode it once.
+# A fresh response is still created per request because middleware (e.g. CORS)
+# may mutate response headers in place
+_INDEX_HTML = get_search_page().encode("utf-8")
+_INDEX_HEADERS = {"Cache-Control": "public, max-age=86400"}
+
+# Body for unhandled errors; the payload is constant, so encode it only once
+_GENERIC_500_BODY = orjson.dumps({
+    "error": "Internal server error",
+    "detail": "An unexpected error occurred"
+})
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create one pooled HTTP/2 client for upstream Aptoide calls, and the batch lookup limit"""
+    limits = httpx.Limits(max_connections=200, max_keepalive_connections=100)
+    async with httpx.AsyncClient(http2=True, timeout=10.0, limits=limits) as client:
+        app.state.http = client
+        app.state.batch_limit = asyncio.Semaphore(BATCH_CONCURRENCY)
+        yield
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Aptoide Scraper API",
     description="API for scraping package data from Aptoide app store",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -450,9 +494,9 @@ app.add_middleware(
 
 
 @app.get("/", tags=["Health"])
-def root():
+async def root():
     """Root endpoint - Returns HTML search interface"""
-    return HTMLResponse(content=get_search_page())
+    return HTMLResponse(content=_INDEX_HTML, headers=_INDEX_HEADERS)
 
 
 @app.get("/health", tags=["Health"])
@@ -467,12 +511,16 @@ def health():
 
 @app.get(
     "/aptoide",
-    response_model=AppDetails,
+    response_model=None,
+    response_class=ORJSONResponse,
     responses={
         200: {
             "description": "Successfully retrieved app details",
             "model": AppDetails
         },
+        304: {
+            "description": "Not modified - the If-None-Match ETag still matches"
+        },
         400: {
             "description": "Bad request - invalid or missing package_name",
             "model": ErrorResponse
@@ -489,11 +537,14 @@ def health():
     tags=["Aptoide"]
 )
 async def get_aptoide_package(
+    request: Request,
     package_name: str = Query(
         ...,
         description="Package identifier (e.g., com.facebook.katana)",
         examples=["com.facebook.katana"],
-        min_length=1
+        min_length=1,
+        max_length=255,
+        pattern=_PKG_PATTERN
     )
 ):
     """
@@ -528,31 +579,12 @@ async def get_aptoide_package(
     }
     ```
     """
+    logger.info(f"Received request for package: {package_name}")
+    
+    # Input is already validated by the Query declaration; only the fetch can fail
     try:
-        # Validate package_name format
-        if not package_name or not package_name.strip():
-            raise HTTPException(
-                status_code=400,
-                detail="Package name cannot be empty"
-            )
-        
-        # Basic validation for package name format
-        if not _is_valid_package_name(package_name):
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid package name format: '{package_name}'. Expected format: com.example.app"
-            )
-        
-        logger.info(f"Received request for package: {package_name}")
-        
-        # Fetch app details
-        app_data = scraper.get_app_details(package_name)
-        
-        logger.info(f"Successfully retrieved data for: {package_name}")
-        
-        # Return compact JSON - let browser's Pretty-print button format it
-        return app_data
-        
+        # Fetch app details, serving repeated packages from the cache
+        app_data = await _get_app_details(package_name, request.app.state.http)
     except AptoideScraperException as e:
         logger.error(f"Scraper error for {package_name}: {str(e)}")
         # Check if it's a not found error
@@ -566,38 +598,149 @@ async def get_aptoide_package(
                 status_code=500,
                 detail=f"Failed to scrape app data: {str(e)}"
             )
-    except HTTPException:
-        # Re-raise HTTP exceptions
-        raise
     except Exception as e:
         logger.error(f"Unexpected error for {package_name}: {str(e)}", exc_info=True)
         raise HTTPException(
             status_code=500,
             detail=f"Internal server error: {str(e)}"
         )
+    
+    logger.info(f"Successfully retrieved data for: {package_name}")
+    
+    # The scraper builds this dict itself, so encode it directly instead of
+    # validating it against AppDetails (which is kept for the OpenAPI docs).
+    # Return compact JSON - let browser's Pretty-print button format it
+    body = orjson.dumps(app_data)
+    
+    # Cache-Control lets browsers and CDNs reuse the response for the cache
+    # lifetime; the ETag lets them revalidate it afterwards with a cheap 304
+    headers = {
+        "Cache-Control": f"public, max-age={CACHE_TTL}",
+        "ETag": f'W/"{hashlib.md5(body, usedforsecurity=False).hexdigest()}"'
+    }
+    if _etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@app.post(
+    "/aptoide/batch",
+    response_model=None,
+    response_class=ORJSONResponse,
+    responses={
+        200: {
+            "description": "Lookup result for every requested package, in request order",
+            "model": List[BatchItem]
+        },
+        422: {
+            "description": "Invalid body - empty list, more than 100 packages, or a malformed package name"
+        }
+    },
+    tags=["Aptoide"]
+)
+async def get_aptoide_batch(
+    request: Request,
+    package_names: List[PackageName] = Body(
+        ...,
+        description="Package identifiers to look up (max 100)",
+        examples=[["com.facebook.katana", "com.whatsapp"]],
+        min_length=1,
+        max_length=BATCH_MAX_SIZE
+    )
+):
+    """
+    Scrape and return app details for several packages at once
+    
+    Lookups run concurrently (at most 20 at a time across all batch requests) and share
+    the same cache as `GET /aptoide`. A failed lookup does not fail the batch;
+    its entry carries an `error` message instead of `data`.
+    
+    **Example Request:**
+    ```
+    POST /aptoide/batch
+    ["com.facebook.katana", "com.nonexistent.app"]
+    ```
+    
+    **Example Response:**
+    ```json
+    [
+      {"package_name": "com.facebook.katana", "data": {"name": "Facebook", ...}, "error": null},
+      {"package_name": "com.nonexistent.app", "data": null, "error": "App not found on Aptoide"}
+    ]
+    ```
+    """
+    logger.info(f"Received batch request for {len(package_names)} packages")
+    
+    client = request.app.state.http
+    # Shared by every batch request, so concurrent batches can't multiply upstream fan-out
+    semaphore = request.app.state.batch_limit
+    
+    async def lookup(package_name: str) -> dict:
+        async with semaphore:
+            try:
+                app_data = await _get_app_details(package_name, client)
+            except AptoideScraperException as e:
+                logger.error(f"Scraper error for {package_name}: {str(e)}")
+                return {"package_name": package_name, "data": None, "error": str(e)}
+        return {"package_name": package_name, "data": app_data, "error": None}
+    
+    results = await asyncio.gather(*(lookup(package_name) for package_name in package_names))
+    
+    # Entries are built from scraper output, so skip re-validating them
+    return ORJSONResponse(content=results)
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an If-None-Match header against an ETag
+    
+    Uses weak comparison (RFC 9110): the W/ prefix is ignored on both sides.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque_tag = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque_tag
+        for candidate in if_none_match.split(",")
+    )
+
+
+async def _get_app_details(package_name: str, client: httpx.AsyncClient) -> dict:
+    """Fetch app details for a package through the response cache"""
+    return await cache.get_or_fetch(
+        f"aptoide:{package_name}",
+        lambda: scraper.get_app_details(package_name, client)
+    )
 
 
-def _is_valid_package_name(package_name: str) -> bool:
+@app.exception_handler(RequestValidationError)
+async def validation_exception_handler(request, exc):
     """
-    Validate Android package name format
+    Report malformed package names as 400 Bad Request
     
-    Basic validation - package names typically follow format: com.company.app
+    The package_name format is checked by the Query pattern; keep the
+    documented 400 response for it and let FastAPI handle the rest (422).
     """
-    import re
-    # Require at least two segments (e.g., com.whatsapp or com.example.app)
-    # Pattern: labels start with a letter, then letters/digits/underscores; segments separated by dots
-    pattern = r'^[a-zA-Z][a-zA-Z0-9_]*(\.[a-zA-Z][a-zA-Z0-9_]*){1,}$'
-    return bool(re.match(pattern, package_name))
+    for error in exc.errors():
+        if error["type"] == "string_pattern_mismatch" and error["loc"][-1] == "package_name":
+            return ORJSONResponse(
+                status_code=400,
+                content={
+                    "detail": f"Invalid package name format: '{error['input']}'. Expected format: com.example.app"
+                }
+            )
+    return await request_validation_exception_handler(request, exc)
 
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     """Global exception handler for unhandled errors"""
     logger.error(f"Unhandled exception: {str(exc)}", exc_info=True)
-    return JSONResponse(
+    return Response(
+        content=_GENERIC_500_BODY,
         status_code=500,
-        content={
-            "error": "Internal server error",
-            "detail": "An unexpected error occurred"
-        }
+        media_type="application/json"
     )
@@ -44,3 +44,10 @@ class ErrorResponse(BaseModel):
     """Schema for error responses"""
     error: str = Field(..., description="Error message")
     detail: Optional[str] = Field(None, description="Additional error details")
+
+
+class BatchItem(BaseModel):
+    """Schema for a single entry of a batch lookup response"""
+    package_name: str = Field(..., description="Requested package identifier")
+    data: Optional[AppDetails] = Field(None, description="App details, if the lookup succeeded")
+    error: Optional[str] = Field(None, description="Error message, if the lookup failed")
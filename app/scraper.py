@@ -1,12 +1,15 @@
-import requests
-import json
-from typing import Optional
+import httpx
+import orjson
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Final, Mapping, Optional, Tuple
 
 
 BASE_URL = "https://en.aptoide.com/"
+SEARCH_API_URL = "https://ws75.aptoide.com/api/7/apps/search"
 
-# Map full state names to abbreviations
-STATE_TO_ABBR = {
+# Map full state names to abbreviations (read-only)
+STATE_TO_ABBR: Final[Mapping[str, str]] = MappingProxyType({
     "Alabama": "AL", "Alaska": "AK", "Arizona": "AZ", "Arkansas": "AR",
     "California": "CA", "Colorado": "CO", "Connecticut": "CT", "Delaware": "DE",
     "Florida": "FL", "Georgia": "GA", "Hawaii": "HI", "Idaho": "ID",
@@ -20,37 +23,65 @@ STATE_TO_ABBR = {
     "South Dakota": "SD", "Tennessee": "TN", "Texas": "TX", "Utah": "UT",
     "Vermont": "VT", "Virginia": "VA", "Washington": "WA", "West Virginia": "WV",
     "Wisconsin": "WI", "Wyoming": "WY", "District of Columbia": "DC"
-}
+})
 
-def resolve_app_url(package_name: str) -> dict:
-    """Resolve and return exact app data by package name.
+# Certificate subject keys copied as-is into the parsed result (ST is mapped separately)
+_CERT_DISPATCH: Final[Mapping[str, str]] = MappingProxyType({
+    "CN": "developer_cn",
+    "O": "organization",
+    "L": "local",
+    "C": "country"
+})
+_CERT_FIELDS: Final = ("developer_cn", "organization", "local", "country", "state_city")
 
-    Uses Aptoide search API but enforces an exact match on the
-    `package` field. This prevents partial inputs like `com.what`
-    from returning unrelated apps.
-    """
+# Shared read-only default for missing nested objects, so lookups don't allocate a new {}
+_EMPTY: Final[Mapping] = MappingProxyType({})
+
+# Search page sizes: a small first page covers the usual case where the exact
+# package is the top hit; the larger page is only fetched if it isn't
+SEARCH_LIMIT_FAST = 5
+SEARCH_LIMIT_FULL = 50
 
-    api_url = (
-        "https://ws75.aptoide.com/api/7/apps/search?"
-        f"query={package_name}&limit=50"
-    )
 
-    r = requests.get(api_url, timeout=10)
+async def _search_exact(package_name: str, client: httpx.AsyncClient, limit: int) -> Tuple[Optional[dict], int]:
+    """Search Aptoide and return (exact match or None, number of results on the page)"""
+    r = await client.get(SEARCH_API_URL, params={"query": package_name, "limit": limit})
     r.raise_for_status()
-    data = r.json()
+    data = orjson.loads(r.content)
 
     try:
         apps = data.get("datalist", {}).get("list", [])
         # Find exact package match
         for app in apps:
             if app.get("package") == package_name:
-                return app
-        # No exact match found
-        raise ValueError("App not found on Aptoide")
+                return app, len(apps)
+        return None, len(apps)
     except (KeyError, TypeError):
         raise ValueError("App not found on Aptoide")
 
 
+async def resolve_app_url(package_name: str, client: httpx.AsyncClient) -> dict:
+    """Resolve and return exact app data by package name.
+
+    Uses Aptoide search API but enforces an exact match on the
+    `package` field. This prevents partial inputs like `com.what`
+    from returning unrelated apps.
+
+    Most searches return the exact package first, so a small page is
+    requested first and the full page only if no exact match was found
+    and more results might exist.
+    """
+
+    app, count = await _search_exact(package_name, client, SEARCH_LIMIT_FAST)
+    if app is None and count >= SEARCH_LIMIT_FAST:
+        app, _ = await _search_exact(package_name, client, SEARCH_LIMIT_FULL)
+    if app is None:
+        # No exact match found
+        raise ValueError("App not found on Aptoide")
+    return app
+
+
+@lru_cache(maxsize=1024)
 def format_downloads(downloads: int) -> str:
     """Convert download count to readable format (e.g., 2B, 1.5M)"""
     if downloads >= 1_000_000_000:
@@ -62,60 +93,52 @@ def format_downloads(downloads: int) -> str:
     return str(downloads)
 
 
+@lru_cache(maxsize=1024)
 def format_size(size_bytes: int) -> str:
     """Convert bytes to MB"""
     return f"{size_bytes / (1024 * 1024):.1f} MB"
 
 
-def parse_certificate_info(cert_owner: str) -> dict:
-    """Parse certificate owner string to extract organization, location, country, etc."""
-    result = {
-        "developer_cn": "",
-        "organization": "",
-        "local": "",
-        "country": "",
-        "state_city": ""
-    }
+@lru_cache(maxsize=4096)
+def parse_certificate_info(cert_owner: str) -> Mapping[str, str]:
+    """Parse certificate owner string to extract organization, location, country, etc.
+
+    Results are memoized: a developer signs every version (and often several
+    apps) with the same certificate. The mapping is shared between calls, so
+    it is returned read-only.
+    """
+    result = dict.fromkeys(_CERT_FIELDS, "")
     
     # Parse certificate string like: "CN=Brian Acton, OU=Engineering, O=WhatsApp Inc., L=Santa Clara, ST=California, C=US"
-    parts = [p.strip() for p in cert_owner.split(",")]
-    
-    for part in parts:
-        if "=" in part:
-            key, value = part.split("=", 1)
-            key = key.strip()
+    for part in cert_owner.split(","):
+        key, sep, value = part.partition("=")
+        if not sep:
+            continue
+        key = key.strip()
+        
+        field = _CERT_DISPATCH.get(key)
+        if field:
+            result[field] = value.strip()
+        elif key == "ST":
+            # Convert full state name to abbreviation; keep as-is if already
+            # abbreviated or not in mapping
             value = value.strip()
-            
-            if key == "CN":
-                result["developer_cn"] = value
-            elif key == "O":
-                result["organization"] = value
-            elif key == "L":
-                result["local"] = value
-            elif key == "C":
-                result["country"] = value
-            elif key == "ST":
-                # Convert full state name to abbreviation if available
-                if value in STATE_TO_ABBR:
-                    result["state_city"] = STATE_TO_ABBR[value]
-                else:
-                    # Keep as-is if already abbreviated or not in mapping
-                    result["state_city"] = value
+            result["state_city"] = STATE_TO_ABBR.get(value, value)
     
-    return result
+    return MappingProxyType(result)
 
 
 def format_app_data(app_info: dict) -> dict:
     """Format raw app data into the desired JSON response format"""
-    file_info = app_info.get("file", {})
-    signature_info = file_info.get("signature", {})
-    cert_parts = parse_certificate_info(signature_info.get("owner", ""))
+    file_info = app_info.get("file") or _EMPTY
+    signature_info = file_info.get("signature") or _EMPTY
+    cert_parts = parse_certificate_info(signature_info.get("owner") or "")
     
-    downloads = app_info.get("stats", {}).get("downloads", 0)
+    downloads = (app_info.get("stats") or _EMPTY).get("downloads") or 0
     
     return {
         "name": app_info.get("name"),
-        "size": format_size(app_info.get("size", 0)),
+        "size": format_size(app_info.get("size") or 0),
         "downloads": format_downloads(downloads),
         "version": file_info.get("vername"),
         "release_date": app_info.get("updated"),
@@ -131,9 +154,9 @@ def format_app_data(app_info: dict) -> dict:
     }
 
 
-def fetch_app_data(package_name: str) -> dict:
+async def fetch_app_data(package_name: str, client: httpx.AsyncClient) -> dict:
     """Fetch app data directly from the API and format it"""
-    app_info = resolve_app_url(package_name)
+    app_info = await resolve_app_url(package_name, client)
     return format_app_data(app_info)
 
 
@@ -147,12 +170,13 @@ class AptoideScraperException(Exception):
 class AptoideScraper:
     """Scraper class to fetch app details from Aptoide"""
     
-    def get_app_details(self, package_name: str) -> dict:
+    async def get_app_details(self, package_name: str, client: httpx.AsyncClient) -> dict:
         """
         Fetch app details for a given package name
         
         Args:
             package_name: Android package identifier (e.g., com.facebook.katana)
+            client: Shared HTTP client used for upstream requests
             
         Returns:
             dict: Formatted app details
@@ -161,7 +185,7 @@ class AptoideScraper:
             AptoideScraperException: If app not found or scraping fails
         """
         try:
-            return fetch_app_data(package_name)
+            return await fetch_app_data(package_name, client)
         except ValueError as e:
             raise AptoideScraperException(str(e))
         except Exception as e:
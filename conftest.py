@@ -0,0 +1,131 @@
+"""
+Shared pytest fixtures for the Aptoide Scraper API test suite
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+import pytest_asyncio
+from app.cache import cache
+from app.main import app
+from app.scraper import scraper, AptoideScraperException
+
+
+# Deterministic app details served by the fake scraper, keyed by package name
+FAKE_APPS = {
+    "com.facebook.katana": {
+        "name": "Facebook",
+        "size": "152.5 MB",
+        "downloads": "2B",
+        "version": "532.0.0.55.71",
+        "release_date": "2025-09-30 17:06:59",
+        "min_screen": "SMALL",
+        "supported_cpu": "arm64-v8a",
+        "package_id": "com.facebook.katana",
+        "sha1_signature": "8A:3C:4B:26:2D:72:1A:CD:49:A4:BF:97:D5:21:31:99:C8:6F:A2:B9",
+        "developer_cn": "Facebook Corporation",
+        "organization": "Facebook Mobile",
+        "local": "Palo Alto",
+        "country": "US",
+        "state_city": "CA"
+    },
+    "com.whatsapp": {
+        "name": "WhatsApp Messenger",
+        "size": "98.3 MB",
+        "downloads": "5B",
+        "version": "2.25.21.78",
+        "release_date": "2025-10-01 09:12:44",
+        "min_screen": "SMALL",
+        "supported_cpu": "arm64-v8a",
+        "package_id": "com.whatsapp",
+        "sha1_signature": "38:A0:F7:D5:05:FE:18:FE:C6:4F:BF:34:3E:CA:AA:F3:10:DB:D7:99",
+        "developer_cn": "Brian Acton",
+        "organization": "WhatsApp Inc.",
+        "local": "Santa Clara",
+        "country": "US",
+        "state_city": "CA"
+    }
+}
+
+
+@pytest_asyncio.fixture(scope="session")
+async def client():
+    """Single async test client for the whole session; runs the app lifespan once
+
+    Under pytest-xdist each worker process has its own session, and so its own client.
+    """
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as test_client:
+            yield test_client
+
+
+# Responses from idempotent GET endpoints, requested once per session and shared
+
+
+@pytest_asyncio.fixture(scope="session")
+async def health_response(client):
+    """Response of GET /health"""
+    return await client.get("/health")
+
+
+@pytest_asyncio.fixture(scope="session")
+async def root_response(client):
+    """Response of GET /"""
+    return await client.get("/")
+
+
+@pytest_asyncio.fixture(scope="session")
+async def docs_response(client):
+    """Response of GET /docs"""
+    return await client.get("/docs")
+
+
+@pytest_asyncio.fixture(scope="session")
+async def redoc_response(client):
+    """Response of GET /redoc"""
+    return await client.get("/redoc")
+
+
+@pytest.fixture
+def fake_scraper(monkeypatch):
+    """Replace the Aptoide scraper with FAKE_APPS lookups (no network)"""
+    async def _fake(package_name, client):
+        try:
+            return FAKE_APPS[package_name]
+        except KeyError:
+            raise AptoideScraperException("App not found on Aptoide")
+
+    monkeypatch.setattr(scraper, "get_app_details", _fake)
+    # Don't let cached results leak between tests
+    cache.clear()
+    yield _fake
+    cache.clear()
+
+
+@pytest.fixture
+def slow_scraper(fake_scraper, monkeypatch):
+    """Factory that installs a scraper taking `delay` seconds per lookup
+
+    Lookups are answered by `lookup` (the fake scraper by default). The returned
+    stats record every call plus the current and peak number of lookups in flight.
+    """
+    def _install(delay, lookup=fake_scraper):
+        stats = SimpleNamespace(calls=[], in_flight=0, peak=0)
+
+        async def _slow(package_name, client):
+            stats.calls.append(package_name)
+            stats.in_flight += 1
+            stats.peak = max(stats.peak, stats.in_flight)
+            try:
+                await asyncio.sleep(delay)
+                return await lookup(package_name, client)
+            finally:
+                stats.in_flight -= 1
+
+        monkeypatch.setattr(scraper, "get_app_details", _slow)
+        return stats
+
+    return _install
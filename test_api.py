@@ -1,29 +1,40 @@
 """
 Test suite for Aptoide Scraper API
 
-Run tests with: pytest test_api.py -v
+Run tests with: pytest -v
+Run in parallel (one worker per CPU): pytest -n auto --dist=loadscope
+Run the live Aptoide tests (deselected by default): pytest -m slow
 """
 
+import asyncio
+
 import pytest
+from fastapi.routing import APIRoute
 from fastapi.testclient import TestClient
-from app.main import app
+from app.cache import cache
+from app.main import BATCH_CONCURRENCY, app
+
+# All tests share the session-scoped client, so they must run on the session event loop
+pytestmark = pytest.mark.asyncio(scope="session")
 
-# Create test client
-client = TestClient(app)
+# Fields every /aptoide response must contain
+REQUIRED_FIELDS = frozenset((
+    "name", "size", "downloads", "version", "release_date",
+    "min_screen", "supported_cpu", "package_id", "sha1_signature",
+    "developer_cn", "organization", "local", "country", "state_city"
+))
 
 
 class TestHealthEndpoint:
     """Tests for health check endpoint"""
     
-    def test_health_endpoint_returns_200(self):
+    async def test_health_endpoint_returns_200(self, health_response):
         """Test that health endpoint returns status 200"""
-        response = client.get("/health")
-        assert response.status_code == 200
+        assert health_response.status_code == 200
     
-    def test_health_endpoint_json_structure(self):
+    async def test_health_endpoint_json_structure(self, health_response):
         """Test that health endpoint returns correct JSON structure"""
-        response = client.get("/health")
-        data = response.json()
+        data = health_response.json()
         
         assert "status" in data
         assert "message" in data
@@ -34,128 +45,270 @@ class TestHealthEndpoint:
 class TestRootEndpoint:
     """Tests for root endpoint"""
     
-    def test_root_returns_200(self):
+    async def test_root_returns_200(self, root_response):
         """Test that root endpoint returns status 200"""
-        response = client.get("/")
-        assert response.status_code == 200
+        assert root_response.status_code == 200
     
-    def test_root_returns_html(self):
+    async def test_root_returns_html(self, root_response):
         """Test that root endpoint returns HTML content"""
-        response = client.get("/")
-        assert response.headers["content-type"].startswith("text/html")
-        assert b"Aptoide App Search" in response.content
+        assert root_response.headers["content-type"].startswith("text/html")
+        assert b"Aptoide App Search" in root_response.content
 
 
 class TestAptoideEndpoint:
     """Tests for main /aptoide endpoint"""
     
-    def test_valid_package_returns_200_or_404(self):
-        """Test that valid package format returns 200 (if found) or 404 (if not found)"""
-        response = client.get("/aptoide?package_name=com.facebook.katana")
-        assert response.status_code in [200, 404]
+    async def test_valid_package_returns_200(self, client, fake_scraper):
+        """Test that a known package returns 200"""
+        response = await client.get("/aptoide?package_name=com.facebook.katana")
+        assert response.status_code == 200
     
-    def test_valid_package_json_structure(self):
-        """Test that valid package returns correct JSON structure if found"""
-        response = client.get("/aptoide?package_name=com.facebook.katana")
+    async def test_valid_package_json_structure(self, client, fake_scraper):
+        """Test that valid package returns correct JSON structure"""
+        response = await client.get("/aptoide?package_name=com.facebook.katana")
+        assert response.status_code == 200
+        data = response.json()
         
-        if response.status_code == 200:
-            data = response.json()
-            
-            # Check all required fields exist
-            required_fields = [
-                "name", "size", "downloads", "version", "release_date",
-                "min_screen", "supported_cpu", "package_id", "sha1_signature",
-                "developer_cn", "organization", "local", "country", "state_city"
-            ]
-            
-            for field in required_fields:
-                assert field in data, f"Missing field: {field}"
-            
-            # Verify package_id matches request
-            assert data["package_id"] == "com.facebook.katana"
-    
-    def test_invalid_package_format_returns_400(self):
-        """Test that invalid package format returns 400"""
-        invalid_packages = [
-            "invalid",           # No dots
-            "test",              # Single word
-            "com.",              # Ends with dot
-            ".com.test",         # Starts with dot
-            "com..test",         # Double dots
-        ]
+        # Check all required fields exist
+        missing = REQUIRED_FIELDS - data.keys()
+        assert not missing, f"Missing fields: {missing}"
         
-        for package in invalid_packages:
-            response = client.get(f"/aptoide?package_name={package}")
-            assert response.status_code == 400, f"Failed for package: {package}"
+        # Verify package_id matches request
+        assert data["package_id"] == "com.facebook.katana"
+    
+    @pytest.mark.parametrize("package", [
+        "invalid",           # No dots
+        "test",              # Single word
+        "com.",              # Ends with dot
+        ".com.test",         # Starts with dot
+        "com..test",         # Double dots
+    ])
+    async def test_invalid_package_format_returns_400(self, client, package):
+        """Test that invalid package format returns 400"""
+        response = await client.get(f"/aptoide?package_name={package}")
+        assert response.status_code == 400, f"Failed for package: {package}"
     
-    def test_missing_package_name_returns_422(self):
+    async def test_missing_package_name_returns_422(self, client):
         """Test that missing package_name parameter returns 422 (validation error)"""
-        response = client.get("/aptoide")
+        response = await client.get("/aptoide")
         assert response.status_code == 422
     
-    def test_empty_package_name_returns_422(self):
+    async def test_empty_package_name_returns_422(self, client):
         """Test that empty package_name returns 422 (validation error)"""
-        response = client.get("/aptoide?package_name=")
+        response = await client.get("/aptoide?package_name=")
         assert response.status_code == 422
     
-    def test_nonexistent_package_returns_404(self):
+    async def test_nonexistent_package_returns_404(self, client, fake_scraper):
         """Test that non-existent package returns 404"""
-        response = client.get("/aptoide?package_name=com.nonexistent.fake.app.xyz123")
+        response = await client.get("/aptoide?package_name=com.nonexistent.fake.app.xyz123")
         assert response.status_code == 404
     
-    def test_valid_two_segment_package(self):
+    async def test_concurrent_requests_share_one_fetch(self, client, slow_scraper):
+        """Test that concurrent requests for an uncached package make a single upstream call"""
+        stats = slow_scraper(0.01)
+        responses = await asyncio.gather(*(
+            client.get("/aptoide?package_name=com.facebook.katana") for _ in range(5)
+        ))
+        
+        assert [response.status_code for response in responses] == [200] * 5
+        assert stats.calls == ["com.facebook.katana"]
+    
+    async def test_concurrent_not_found_requests_share_one_fetch(self, client, slow_scraper):
+        """Test that concurrent misses for an unknown package share one failed upstream call"""
+        stats = slow_scraper(0.01)
+        responses = await asyncio.gather(*(
+            client.get("/aptoide?package_name=com.nonexistent.fake.app") for _ in range(5)
+        ))
+        
+        assert [response.status_code for response in responses] == [404] * 5
+        assert stats.calls == ["com.nonexistent.fake.app"]
+    
+    async def test_valid_two_segment_package(self, client, fake_scraper):
         """Test that two-segment package names are accepted"""
-        response = client.get("/aptoide?package_name=com.whatsapp")
-        assert response.status_code in [200, 404]  # Should not return 400
+        response = await client.get("/aptoide?package_name=com.whatsapp")
+        assert response.status_code == 200
+        assert response.json()["package_id"] == "com.whatsapp"
+
+
+class TestBatchEndpoint:
+    """Tests for /aptoide/batch endpoint"""
+    
+    async def test_empty_batch_returns_422(self, client):
+        """Test that an empty package list returns 422 (validation error)"""
+        response = await client.post("/aptoide/batch", json=[])
+        assert response.status_code == 422
+    
+    async def test_oversized_batch_returns_422(self, client):
+        """Test that more than 100 packages returns 422 (validation error)"""
+        packages = [f"com.example.app{i}" for i in range(101)]
+        response = await client.post("/aptoide/batch", json=packages)
+        assert response.status_code == 422
+    
+    async def test_invalid_package_in_batch_returns_422(self, client):
+        """Test that a malformed package name in the batch returns 422"""
+        response = await client.post("/aptoide/batch", json=["com.facebook.katana", "invalid"])
+        assert response.status_code == 422
+    
+    async def test_batch_returns_results_in_order(self, client, fake_scraper):
+        """Test that each package gets a result, in request order, with per-package errors"""
+        packages = ["com.whatsapp", "com.nonexistent.fake.app", "com.facebook.katana"]
+        response = await client.post("/aptoide/batch", json=packages)
+        assert response.status_code == 200
+        data = response.json()
+        
+        assert [item["package_name"] for item in data] == packages
+        assert data[0]["data"]["package_id"] == "com.whatsapp"
+        assert data[1]["data"] is None
+        assert "not found" in data[1]["error"].lower()
+        assert data[2]["error"] is None
+    
+    async def test_concurrent_batches_share_concurrency_limit(self, client, slow_scraper):
+        """Test that concurrent batches together stay within BATCH_CONCURRENCY upstream lookups"""
+        async def _any_package(package_name, http_client):
+            return {"name": "Example", "package_id": package_name}
+        
+        stats = slow_scraper(0.02, lookup=_any_package)
+        batches = [[f"com.example.batch{b}.app{i}" for i in range(30)] for b in range(2)]
+        responses = await asyncio.gather(*(
+            client.post("/aptoide/batch", json=batch) for batch in batches
+        ))
+        
+        assert [response.status_code for response in responses] == [200, 200]
+        assert stats.peak == BATCH_CONCURRENCY
 
 
 class TestErrorHandling:
     """Tests for error handling"""
     
-    def test_404_error_contains_detail(self):
+    async def test_404_error_contains_detail(self, client, fake_scraper):
         """Test that 404 errors contain helpful detail message"""
-        response = client.get("/aptoide?package_name=com.fake.nonexistent.app")
-        if response.status_code == 404:
-            data = response.json()
-            assert "detail" in data
-            assert "not found" in data["detail"].lower()
+        response = await client.get("/aptoide?package_name=com.fake.nonexistent.app")
+        assert response.status_code == 404
+        data = response.json()
+        assert "detail" in data
+        assert "not found" in data["detail"].lower()
     
-    def test_400_error_contains_detail(self):
+    async def test_400_error_contains_detail(self, client):
         """Test that 400 errors contain helpful detail message"""
-        response = client.get("/aptoide?package_name=invalid")
+        response = await client.get("/aptoide?package_name=invalid")
         assert response.status_code == 400
         data = response.json()
         assert "detail" in data
         assert "format" in data["detail"].lower()
 
 
+class TestGlobalExceptionHandler:
+    """Tests for the handler of otherwise unhandled exceptions"""
+    
+    async def test_unhandled_error_returns_generic_500(self, monkeypatch):
+        """Test that an unhandled exception returns the constant JSON 500 body"""
+        def _boom():
+            raise RuntimeError("boom")
+        
+        monkeypatch.setattr(app.router, "routes", [*app.router.routes, APIRoute("/boom", _boom)])
+        # No `with`: the lifespan is already running for the session client.
+        # TestClient is synchronous, so keep it off the event loop thread
+        test_client = TestClient(app, raise_server_exceptions=False)
+        response = await asyncio.to_thread(test_client.get, "/boom")
+        
+        assert response.status_code == 500
+        assert response.headers["content-type"] == "application/json"
+        assert response.json() == {
+            "error": "Internal server error",
+            "detail": "An unexpected error occurred"
+        }
+
+
 class TestAPIDocumentation:
     """Tests for API documentation endpoints"""
     
-    def test_docs_endpoint_accessible(self):
+    async def test_docs_endpoint_accessible(self, docs_response):
         """Test that /docs endpoint is accessible"""
-        response = client.get("/docs")
-        assert response.status_code == 200
+        assert docs_response.status_code == 200
     
-    def test_redoc_endpoint_accessible(self):
+    async def test_redoc_endpoint_accessible(self, redoc_response):
         """Test that /redoc endpoint is accessible"""
-        response = client.get("/redoc")
-        assert response.status_code == 200
+        assert redoc_response.status_code == 200
 
 
 class TestResponseHeaders:
     """Tests for response headers"""
     
-    def test_json_content_type(self):
+    async def test_json_content_type(self, health_response):
         """Test that JSON endpoints return correct content type"""
-        response = client.get("/health")
-        assert "application/json" in response.headers["content-type"]
+        assert "application/json" in health_response.headers["content-type"]
     
-    def test_aptoide_response_is_json(self):
+    async def test_aptoide_response_is_json(self, client, fake_scraper):
         """Test that /aptoide endpoint returns JSON content type"""
-        response = client.get("/aptoide?package_name=com.facebook.katana")
-        if response.status_code == 200:
-            assert "application/json" in response.headers["content-type"]
+        response = await client.get("/aptoide?package_name=com.facebook.katana")
+        assert response.status_code == 200
+        assert "application/json" in response.headers["content-type"]
+
+
+class TestConditionalRequests:
+    """Tests for ETag / If-None-Match handling on /aptoide"""
+    
+    async def test_response_has_etag(self, client, fake_scraper):
+        """Test that successful responses carry a weak ETag"""
+        response = await client.get("/aptoide?package_name=com.facebook.katana")
+        assert response.status_code == 200
+        assert response.headers["etag"].startswith('W/"')
+    
+    async def test_matching_etag_returns_304(self, client, fake_scraper):
+        """Test that a matching If-None-Match returns 304 with no body"""
+        etag = (await client.get("/aptoide?package_name=com.facebook.katana")).headers["etag"]
+        response = await client.get(
+            "/aptoide?package_name=com.facebook.katana",
+            headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+        assert response.content == b""
+    
+    async def test_stale_etag_returns_200(self, client, fake_scraper):
+        """Test that a non-matching If-None-Match returns the full response"""
+        response = await client.get(
+            "/aptoide?package_name=com.facebook.katana",
+            headers={"If-None-Match": 'W/"stale"'}
+        )
+        assert response.status_code == 200
+        assert response.json()["package_id"] == "com.facebook.katana"
+
+
+@pytest.mark.slow
+class TestLiveAptoide:
+    """End-to-end tests against the real Aptoide API (deselected by default)"""
+    
+    @pytest.fixture(autouse=True)
+    def fresh_cache(self):
+        """Make sure every lookup reaches Aptoide"""
+        cache.clear()
+    
+    async def test_live_valid_package_returns_200(self, client):
+        """Test that a well-known package is found on Aptoide"""
+        response = await client.get("/aptoide?package_name=com.facebook.katana")
+        assert response.status_code == 200
+    
+    async def test_live_valid_package_json_structure(self, client):
+        """Test that a real Aptoide lookup returns the full JSON structure"""
+        response = await client.get("/aptoide?package_name=com.facebook.katana")
+        assert response.status_code == 200
+        data = response.json()
+        
+        missing = REQUIRED_FIELDS - data.keys()
+        assert not missing, f"Missing fields: {missing}"
+        assert data["package_id"] == "com.facebook.katana"
+    
+    async def test_live_nonexistent_package_returns_404(self, client):
+        """Test that a package unknown to Aptoide returns 404"""
+        response = await client.get("/aptoide?package_name=com.nonexistent.fake.app.xyz123")
+        assert response.status_code == 404
+    
+    async def test_live_404_error_contains_detail(self, client):
+        """Test that a real 404 contains a helpful detail message"""
+        response = await client.get("/aptoide?package_name=com.fake.nonexistent.app")
+        assert response.status_code == 404
+        assert "not found" in response.json()["detail"].lower()
 
 
 # Pytest configuration
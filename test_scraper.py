@@ -0,0 +1,213 @@
+"""
+Unit tests for the Aptoide scraper helpers
+
+Run tests with: pytest test_scraper.py -v
+"""
+
+import httpx
+import orjson
+import pytest
+from app.scraper import (
+    SEARCH_LIMIT_FAST, SEARCH_LIMIT_FULL, format_app_data, format_downloads,
+    format_size, parse_certificate_info, resolve_app_url
+)
+
+
+# Cert owner strings and their expected parse, matching the original implementation
+CERTIFICATE_CASES = [
+    (
+        "CN=Brian Acton, OU=Engineering, O=WhatsApp Inc., L=Santa Clara, ST=California, C=US",
+        {"developer_cn": "Brian Acton", "organization": "WhatsApp Inc.", "local": "Santa Clara",
+         "country": "US", "state_city": "CA"},
+    ),
+    (   # Full state name is abbreviated
+        "ST=California",
+        {"developer_cn": "", "organization": "", "local": "", "country": "", "state_city": "CA"},
+    ),
+    (   # Unknown state passes through unchanged
+        "ST=Ontario",
+        {"developer_cn": "", "organization": "", "local": "", "country": "", "state_city": "Ontario"},
+    ),
+    (   # Only the first '=' separates key and value
+        "CN=a=b, O=x",
+        {"developer_cn": "a=b", "organization": "x", "local": "", "country": "", "state_city": ""},
+    ),
+    (   # Parts without '=' are ignored
+        "CN=Dev, junk, C=US",
+        {"developer_cn": "Dev", "organization": "", "local": "", "country": "US", "state_city": ""},
+    ),
+    (
+        "",
+        {"developer_cn": "", "organization": "", "local": "", "country": "", "state_city": ""},
+    ),
+]
+
+
+# Download counts at the K/M/B boundaries and their display form
+DOWNLOADS_CASES = [
+    (999, "999"),
+    (1_000, "1.0K"),
+    (1_500, "1.5K"),
+    (1_000_000, "1.0M"),
+    (1_000_000_000, "1B"),
+]
+
+# Byte sizes and their display form in MB
+SIZE_CASES = [
+    (0, "0.0 MB"),
+    (1_048_576, "1.0 MB"),
+    (159_907_840, "152.5 MB"),
+]
+
+
+# Sample search result entry as returned by the Aptoide API
+SAMPLE_APP = {
+    "name": "WhatsApp Messenger",
+    "package": "com.whatsapp",
+    "size": 103_075_840,
+    "updated": "2025-10-01 09:12:44",
+    "stats": {"downloads": 5_000_000_000},
+    "file": {
+        "vername": "2.25.21.78",
+        "signature": {
+            "sha1": "38:A0:F7:D5:05:FE:18:FE:C6:4F:BF:34:3E:CA:AA:F3:10:DB:D7:99",
+            "owner": "CN=Brian Acton, OU=Engineering, O=WhatsApp Inc., L=Santa Clara, ST=California, C=US"
+        }
+    }
+}
+
+# Formatted fields for an app with no file, signature or stats information
+EMPTY_DETAILS = {
+    "version": None, "sha1_signature": None, "developer_cn": "", "organization": "",
+    "local": "", "country": "", "state_city": ""
+}
+
+# Raw app entries and the formatted fields expected from format_app_data
+APP_DATA_CASES = [
+    (
+        SAMPLE_APP,
+        {
+            "name": "WhatsApp Messenger",
+            "size": "98.3 MB",
+            "downloads": "5B",
+            "version": "2.25.21.78",
+            "release_date": "2025-10-01 09:12:44",
+            "min_screen": "SMALL",
+            "supported_cpu": "arm64-v8a",
+            "package_id": "com.whatsapp",
+            "sha1_signature": "38:A0:F7:D5:05:FE:18:FE:C6:4F:BF:34:3E:CA:AA:F3:10:DB:D7:99",
+            "developer_cn": "Brian Acton",
+            "organization": "WhatsApp Inc.",
+            "local": "Santa Clara",
+            "country": "US",
+            "state_city": "CA"
+        },
+    ),
+    ({**SAMPLE_APP, "file": None}, EMPTY_DETAILS),
+    (
+        {**SAMPLE_APP, "file": {"vername": "2.25.21.78", "signature": None}},
+        {**EMPTY_DETAILS, "version": "2.25.21.78"},
+    ),
+    (
+        {**SAMPLE_APP, "file": {"signature": {"sha1": "AB:CD", "owner": None}}},
+        {**EMPTY_DETAILS, "sha1_signature": "AB:CD"},
+    ),
+    ({**SAMPLE_APP, "stats": None}, {"downloads": "0"}),
+    ({**SAMPLE_APP, "stats": {"downloads": None}}, {"downloads": "0"}),
+    ({**SAMPLE_APP, "size": None}, {"size": "0.0 MB"}),
+]
+
+
+class TestFormatAppData:
+    """Tests for format_app_data"""
+    
+    @pytest.mark.parametrize("app_info, expected", APP_DATA_CASES)
+    def test_formats_app_fields(self, app_info, expected):
+        """Test that raw app entries, including null nested objects, format as expected"""
+        details = format_app_data(app_info)
+        assert {field: details[field] for field in expected} == expected
+
+
+class TestFormatters:
+    """Tests for format_downloads and format_size"""
+    
+    @pytest.mark.parametrize("downloads, expected", DOWNLOADS_CASES)
+    def test_format_downloads(self, downloads, expected):
+        """Test that download counts are abbreviated at the K/M/B boundaries"""
+        assert format_downloads(downloads) == expected
+        # A memoized repeat returns the same value
+        assert format_downloads(downloads) == expected
+    
+    @pytest.mark.parametrize("size_bytes, expected", SIZE_CASES)
+    def test_format_size(self, size_bytes, expected):
+        """Test that byte sizes are shown in MB with one decimal"""
+        assert format_size(size_bytes) == expected
+        assert format_size(size_bytes) == expected
+
+
+class TestParseCertificateInfo:
+    """Tests for parse_certificate_info"""
+    
+    @pytest.mark.parametrize("cert_owner, expected", CERTIFICATE_CASES)
+    def test_parses_owner_fields(self, cert_owner, expected):
+        """Test that owner strings parse into the expected fields"""
+        assert dict(parse_certificate_info(cert_owner)) == expected
+    
+    def test_repeated_calls_return_equal_read_only_results(self):
+        """Test that memoized results are equal across calls and cannot be mutated"""
+        owner = "CN=Brian Acton, O=WhatsApp Inc., ST=California, C=US"
+        first = parse_certificate_info(owner)
+        second = parse_certificate_info(owner)
+        
+        assert first == second
+        with pytest.raises(TypeError):
+            first["developer_cn"] = "Someone Else"
+        assert parse_certificate_info(owner)["developer_cn"] == "Brian Acton"
+
+
+class TestResolveAppUrl:
+    """Tests for the two-phase Aptoide search in resolve_app_url"""
+    
+    @staticmethod
+    def search_client(pages, limits):
+        """HTTP client answering each search `limit` with the package names in `pages`"""
+        def handler(request):
+            limit = int(request.url.params["limit"])
+            limits.append(limit)
+            apps = [{"package": package} for package in pages[limit]]
+            return httpx.Response(200, content=orjson.dumps({"datalist": {"list": apps}}))
+        
+        return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    
+    async def test_exact_hit_on_first_page(self):
+        """Test that a match on the small first page needs a single call"""
+        limits = []
+        pages = {SEARCH_LIMIT_FAST: ["com.example.app", "com.example.app.lite"]}
+        async with self.search_client(pages, limits) as http_client:
+            app_info = await resolve_app_url("com.example.app", http_client)
+        
+        assert app_info["package"] == "com.example.app"
+        assert limits == [SEARCH_LIMIT_FAST]
+    
+    async def test_short_first_page_without_match(self):
+        """Test that a short first page without a match fails without a second call"""
+        limits = []
+        pages = {SEARCH_LIMIT_FAST: ["com.example.other"]}
+        async with self.search_client(pages, limits) as http_client:
+            with pytest.raises(ValueError, match="not found"):
+                await resolve_app_url("com.example.app", http_client)
+        
+        assert limits == [SEARCH_LIMIT_FAST]
+    
+    async def test_full_first_page_falls_back_to_full_search(self):
+        """Test that a full first page without a match retries with the full limit"""
+        limits = []
+        pages = {
+            SEARCH_LIMIT_FAST: [f"com.example.other{i}" for i in range(SEARCH_LIMIT_FAST)],
+            SEARCH_LIMIT_FULL: [f"com.example.other{i}" for i in range(10)] + ["com.example.app"]
+        }
+        async with self.search_client(pages, limits) as http_client:
+            app_info = await resolve_app_url("com.example.app", http_client)
+        
+        assert app_info["package"] == "com.example.app"
+        assert limits == [SEARCH_LIMIT_FAST, SEARCH_LIMIT_FULL]